@@ -15,9 +15,18 @@ The second sample uses player data from a fantasy football website as input and
 creates a team with a fixed number of positions by optimising on a function. It
 is the same algorithm as the first, but constrained to a set number of positions
 
+Both solvers also accept a PlayerTable, a columnar version of the player list
+that keeps every attribute in typed arrays, so the key functions are evaluated
+for all players in one pass. numpy is only imported by the code that needs it
+(PlayerTable, PreparedFractional, IncrementalLineup).
+
 """
 
-from bs4 import BeautifulSoup
+import bisect
+import hashlib
+import json
+import numbers
+import os
 
 
 ##########################################
@@ -28,7 +37,7 @@ def greedy_fractional(items, max_weight, key_function):
     Greedy fractional knapsack solution
 
     Parameters:
-        items - list of Items
+        items - list of Items, or a PlayerTable
         max_weight - knapsack size
         key_function - function to sort items with
 
@@ -53,7 +62,7 @@ def greedy_fractional(items, max_weight, key_function):
     """
 
     # Sort items
-    sorted_items = sorted(items, key=key_function, reverse=True)
+    sorted_items = sort_items(items, key_function)
     result = []  # list of tuples: each item is (item, fraction of the item in knapsack), eg (item,0.8)
     total_value = 0.0  # knapsack value
     total_weight = 0.0  # knapsack weight <= max_weight
@@ -77,18 +86,118 @@ def greedy_fractional(items, max_weight, key_function):
     return result, total_value
 
 
+class PreparedFractional(object):
+    """
+    Greedy fractional knapsack prepared for many knapsack sizes
+
+    Sorts the items by key_function once and keeps prefix sums of their weights
+    and values. Each query then only needs a binary search over the prefix
+    weights, instead of the full sort and scan of greedy_fractional.
+    Gives the same value as greedy_fractional for items with positive weights.
+
+    Parameters:
+        items - list of Items, or a PlayerTable
+        key_function - function to sort items with
+
+    Example use:
+    >>> names = ['clock', 'painting', 'radio']
+    >>> values = [175,90,20]
+    >>> weights = [10,9,4]
+    >>> items = [Player(n, '', v, w, 'Forward') for n,v,w in zip(names, values, weights)]
+    >>> solver = PreparedFractional(items, density)
+    >>> solver.solve(5)
+    (87.5, <clock, Forward, , 175, 10>)
+    >>> solver.solve(13)
+    (205.0, <painting, Forward, , 90, 9>)
+    >>> solver.solve(30)
+    (285.0, None)
+    >>> vals, splits = solver.solve_many([5, 13, 30])
+    >>> vals.tolist(), splits.tolist()
+    ([87.5, 205.0, 285.0], [0, 1, 3])
+    """
+    def __init__(self, items, key_function):
+        import numpy as np
+
+        if isinstance(items, PlayerTable):
+            order = items.argsort(key_function)
+            self.items = [items[i] for i in order]
+            weights = items.weights[order]
+            values = items.values[order]
+        else:
+            self.items = sort_items(items, key_function)
+            weights = [item.get_weight() for item in self.items]
+            values = [item.get_value() for item in self.items]
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.values = np.asarray(values, dtype=np.float64)
+        # cum_weights[i]: weight of the first i+1 items, cum_values[i]: value of the first i items
+        self.cum_weights = np.cumsum(self.weights)
+        self.cum_values = np.concatenate(([0.0], np.cumsum(self.values)))
+
+    def solve(self, max_weight):
+        """
+        Solve the knapsack for one size
+
+        Returns:
+            the value of the resulting knapsack
+            the item that only fits partially (None if all items fit)
+        """
+        values, splits = self.solve_many([max_weight])
+        split = splits[0]
+        return float(values[0]), (self.items[split] if split < len(self.items) else None)
+
+    def solve_many(self, max_weights):
+        """
+        Solve the knapsack for an array of sizes in one call
+
+        Returns:
+            array with the knapsack value for each size
+            array with the position (in self.items) of the item that only fits
+            partially for each size; len(self.items) if all items fit
+        """
+        import numpy as np
+
+        max_weights = np.asarray(max_weights, dtype=np.float64)
+        n = len(self.items)
+        # number of items that fit completely
+        splits = np.searchsorted(self.cum_weights, max_weights, side='right')
+        values = self.cum_values[splits]
+        partial = splits < n
+        k = splits[partial]
+        used = np.where(k > 0, self.cum_weights[k - 1], 0.0)
+        values[partial] += (max_weights[partial] - used) / self.weights[k] * self.values[k]
+        return values, splits
+
+
 ##########################################
 # Helper functions for greedy fractional
 
+def sort_items(items, key_function):
+    """
+    Sort items from highest to lowest key
+
+    Parameters:
+        items - list of Items, or a PlayerTable
+        key_function - function to sort items with
+
+    Returns:
+        list of items sorted by key_function in descending order. Ties keep
+        their original order. For a PlayerTable the key is evaluated once over
+        the whole table and the result is a list of PlayerViews
+    """
+    if isinstance(items, PlayerTable):
+        return [items[i] for i in items.argsort(key_function)]
+    return sorted(items, key=key_function, reverse=True)
+
+
 def value(item):
     """
     Return the value of the item
 
     Parameters:
-        item - an Item object
+        item - an Item object (or a PlayerTable)
 
     Returns:
-        the value of the item
+        the value of the item (an array of values for a PlayerTable)
     """
     return item.get_value()
 
@@ -98,10 +207,10 @@ def weight_inverse(item):
     Return the inverse of item weights
 
     Parameters:
-        item - an Item object
+        item - an Item object (or a PlayerTable)
 
     Returns:
-        the inverse of the item's weight
+        the inverse of the item's weight (an array for a PlayerTable)
     """
     return 1/item.get_weight()
 
@@ -111,10 +220,10 @@ def density(item):
     Return the item's ratio of value to weight
 
     Parameters:
-        item - an Item object
+        item - an Item object (or a PlayerTable)
 
     Returns:
-        the ratio of value to weight
+        the ratio of value to weight (an array for a PlayerTable)
     """
     return item.get_value() / item.get_weight()
 
@@ -122,12 +231,21 @@ def density(item):
 ##########################################
 # Greedy heuristic with team constraints
 
+# max players for each position, and in total
+MAX_POSITION = {
+                 "Goalkeeper": 1,
+                 "Defender": 4,
+                 "Midfielder": 4,
+                 "Forward":2
+               }
+MAX_PLAYERS = 11
+
 def greedy_heuristic(items, max_weight, key_function):
     """
     Greedy knapsack solution with team constraints
 
     Parameters:
-        items - list of Items
+        items - list of Items, or a PlayerTable
         max_weight - knapsack size
         key_function - function to sort items with
 
@@ -144,16 +262,8 @@ def greedy_heuristic(items, max_weight, key_function):
     
     """
 
-    # max players for each position
-    max_position =	{
-                      "Goalkeeper": 1,
-                      "Defender": 4,
-                      "Midfielder": 4,
-                      "Forward":2
-                    }
-
     # init: sort items
-    sorted_items = sorted(items, key=key_function, reverse=True)
+    sorted_items = sort_items(items, key_function)
     result = []
     
     total_value = 0.0  # knapsack value
@@ -170,10 +280,10 @@ def greedy_heuristic(items, max_weight, key_function):
     for index in range(len(sorted_items)):
         cur_item = sorted_items[index]  
         #Check we havent reached the MAX players (so we dont check pointlessly when we are full)
-        if (total_players>=11):
+        if (total_players>=MAX_PLAYERS):
             return result, total_value
         #Check we havent reached the max players for its kind
-        elif (max_position[cur_item.get_position()]>total_headcount[cur_item.get_position()]):
+        elif (MAX_POSITION[cur_item.get_position()]>total_headcount[cur_item.get_position()]):
             #Check we havent reached the max weight
             if ((total_weight+cur_item.get_weight())<=max_weight):
                 # if we can fit the entire item into knapsack, do it, update its weight and value
@@ -184,9 +294,317 @@ def greedy_heuristic(items, max_weight, key_function):
                 total_weight += cur_item.get_weight()
                 total_headcount[cur_item.get_position()] += 1
                 total_players += 1
-    
+
     return result, total_value
 
+
+def select_team(table, order, max_weight, excluded=frozenset()):
+    """
+    Greedy team selection on a PlayerTable, following a given order
+
+    Same rules as greedy_heuristic, but works on row indices and can skip
+    a set of excluded players.
+
+    Parameters:
+        table - PlayerTable
+        order - row indices, best first (eg table.argsort(density))
+        max_weight - knapsack size
+        excluded - set of row indices that can't be picked
+
+    Returns:
+        tuple with the row indices of the team, in pick order
+        the value of the team
+        the weight of the team
+    """
+    max_position = [MAX_POSITION[p] for p in POSITIONS]
+    headcount = [0] * len(POSITIONS)
+    positions = table.positions.tolist()
+    weights = table.weights.tolist()
+    values = table.values.tolist()
+
+    team = []
+    total_value = 0
+    total_weight = 0
+    for i in order:
+        if len(team) >= MAX_PLAYERS:
+            break
+        if i in excluded:
+            continue
+        p = positions[i]
+        if headcount[p] < max_position[p] and total_weight + weights[i] <= max_weight:
+            team.append(i)
+            headcount[p] += 1
+            total_value += values[i]
+            total_weight += weights[i]
+    return tuple(team), total_value, total_weight
+
+
+##########################################
+# Top-N lineups
+
+def top_lineups(items, max_weight, key_function, n, max_overlap=None, beam_width=None,
+                max_rounds=10, processes=None):
+    """
+    Find the n best distinct full teams under the position and budget limits
+
+    Beam search with exclusion cuts: each team found is branched into one new
+    solve per player in it, with that player excluded. Teams short of
+    MAX_PLAYERS are branched too (dropping an expensive player can make room
+    for a full team), but only full teams are returned. The beam_width best
+    new teams of a round, fullest first, are branched in the next one. The
+    solves of each round are spread over a process pool; the player data is
+    sent once per worker.
+
+    With max_overlap, lineups are taken best first as long as they share at
+    most max_overlap players with the ones already taken. While fewer than n
+    are taken, one more solve is run excluding every player of the taken
+    lineups except their max_overlap first picks, so its team respects the
+    cap. This stops when that solve can't make a full team, so fewer than n
+    lineups can come back.
+
+    Parameters:
+        items - list of Players, or a PlayerTable
+        max_weight - knapsack size
+        key_function - function to sort items with (only used in this process)
+        n - number of lineups wanted
+        max_overlap - max number of players two returned lineups can share (None: no limit)
+        beam_width - teams branched per round (default n)
+        max_rounds - max number of branching rounds
+        processes - pool size (None: one per CPU, 1: run in this process)
+
+    Returns:
+        list of up to n tuples (team, value, weight), best value first,
+        where team is a list of items
+
+    Example use:
+    >>> pos = ['Goalkeeper'] * 2 + ['Defender'] * 5 + ['Midfielder'] * 5 + ['Forward'] * 3
+    >>> items = [Player('p%d' % i, 'T', 10 + i, 5, p) for i, p in enumerate(pos)]
+    >>> lineups = top_lineups(items, 55, value, 3, processes=1)
+    >>> [(v, w) for team, v, w in lineups]
+    [(194.0, 55), (193.0, 55), (193.0, 55)]
+    >>> lineups = top_lineups(items, 55, value, 3, max_overlap=9, processes=1)
+    >>> [(v, w) for team, v, w in lineups]
+    [(194.0, 55), (192.0, 55), (192.0, 55)]
+    """
+    import multiprocessing
+
+    table = items if isinstance(items, PlayerTable) else PlayerTable.from_players(items)
+    order = table.argsort(key_function).tolist()
+    if beam_width is None:
+        beam_width = n
+
+    found = {}  # player-index set of full teams -> (value, weight, team)
+    seen_teams = set()
+    frontier = [frozenset()]
+    seen_cuts = set(frontier)
+    pool = None
+    if processes == 1:
+        init_lineup_worker(table, order, max_weight)
+        solve = map
+    else:
+        pool = multiprocessing.Pool(processes, initializer=init_lineup_worker,
+                                    initargs=(table, order, max_weight))
+        solve = pool.map
+    try:
+        for _ in range(max_rounds):
+            if not frontier:
+                break
+            new_teams = []
+            for cut, (team, total_value, total_weight) in zip(frontier, solve(solve_lineup_excluding, frontier)):
+                # Every set of players is branched only once, and only full teams count
+                key = frozenset(team)
+                if not team or key in seen_teams:
+                    continue
+                seen_teams.add(key)
+                if len(team) >= MAX_PLAYERS:
+                    found[key] = (total_value, total_weight, team)
+                new_teams.append((len(team), total_value, cut, team))
+            new_teams.sort(key=lambda t: (t[0], t[1]), reverse=True)
+            frontier = []
+            for _, _, cut, team in new_teams[:beam_width]:
+                for i in team:
+                    new_cut = cut | {i}
+                    if new_cut not in seen_cuts:
+                        seen_cuts.add(new_cut)
+                        frontier.append(new_cut)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    # Rank and keep lineups that don't overlap too much with better ones
+    result = []
+    for total_value, total_weight, team in sorted(found.values(), key=lambda t: t[0], reverse=True):
+        if len(result) >= n:
+            break
+        if max_overlap is not None and \
+                any(len(set(team) & set(other)) > max_overlap for other, _, _ in result):
+            continue
+        result.append((team, total_value, total_weight))
+
+    # Not enough lineups under the cap: solve again keeping only the first
+    # max_overlap picks of every lineup taken so far
+    while max_overlap is not None and len(result) < n:
+        cut = frozenset(i for team, _, _ in result for i in team[max_overlap:])
+        team, total_value, total_weight = select_team(table, order, max_weight, cut)
+        if len(team) < MAX_PLAYERS or frozenset(team) in set(frozenset(t) for t, _, _ in result):
+            break
+        result.append((team, total_value, total_weight))
+    result.sort(key=lambda t: t[1], reverse=True)
+
+    return [([items[i] for i in team], float(total_value), total_weight)
+            for team, total_value, total_weight in result]
+
+
+# Data of the top_lineups worker processes, set once per worker by init_lineup_worker
+lineup_worker_data = None
+
+
+def init_lineup_worker(table, order, max_weight):
+    """
+    Process pool initializer for top_lineups: keeps the player data in the worker
+    """
+    global lineup_worker_data
+    lineup_worker_data = (table, order, max_weight)
+
+
+def solve_lineup_excluding(excluded):
+    """
+    Greedy team in a top_lineups worker, with the excluded players skipped
+    """
+    table, order, max_weight = lineup_worker_data
+    return select_team(table, order, max_weight, excluded)
+
+
+##########################################
+# Incremental re-optimisation
+
+class IncrementalLineup(object):
+    """
+    Greedy team with constraints, kept up to date as player data changes
+
+    Keeps the players sorted by key_function and the current team. When values
+    and weights of some players change, update() moves only those players in
+    the sorted order and re-runs the greedy selection from the first place in
+    the order that changed, keeping the picks made before it. The team is
+    always the same as greedy_heuristic would pick from scratch.
+
+    Parameters:
+        items - list of Players, or a PlayerTable (which update() modifies)
+        max_weight - knapsack size
+        key_function - function to sort items with
+
+    Example use:
+    >>> pos = ['Goalkeeper'] * 2 + ['Defender'] * 5 + ['Midfielder'] * 5 + ['Forward'] * 3
+    >>> items = [Player('p%d' % i, 'T', 10 + i, 5, p) for i, p in enumerate(pos)]
+    >>> lineup = IncrementalLineup(items, 55, value)
+    >>> lineup.value
+    194.0
+    >>> transfers_out, transfers_in = lineup.update({0: (30, 5), 12: (40, 5)})
+    >>> transfers_out, transfers_in
+    ([<p1, Goalkeeper, T, 11, 5>, <p13, Forward, T, 23, 5>], [<p0, Goalkeeper, T, 30, 5>, <p12, Forward, T, 40, 5>])
+    >>> lineup.value == greedy_heuristic(lineup.table, 55, value)[1]
+    True
+    """
+    def __init__(self, items, max_weight, key_function):
+        import numpy as np
+
+        self.table = items if isinstance(items, PlayerTable) else PlayerTable.from_players(items)
+        self.max_weight = max_weight
+        self.key_function = key_function
+        self.keys = np.asarray(key_function(self.table), dtype=np.float64).tolist()
+        # (-key, row) pairs: sorting them gives the same order as table.argsort
+        self.order = sorted((-k, i) for i, k in enumerate(self.keys))
+        self.picks = []  # (-key, row) pairs of the team, in pick order
+        self.repair()
+
+    @property
+    def team(self):
+        return [self.table[i] for _, i in self.picks]
+
+    @property
+    def value(self):
+        return float(sum(self.table.values[i] for _, i in self.picks))
+
+    @property
+    def weight(self):
+        return int(sum(self.table.weights[i] for _, i in self.picks))
+
+    def update(self, changes):
+        """
+        Apply new values and weights and repair the team
+
+        Parameters:
+            changes - dictionary: key - table row of the player, value - (new value, new weight)
+                      values and weights must be integers, like in Player
+
+        Returns:
+            list of players leaving the team
+            list of players joining the team
+
+        All changes are checked before any is applied: a bad row or a
+        non-integer value raises ValueError and leaves the lineup unchanged.
+        """
+        for i, (new_value, new_weight) in changes.items():
+            if not isinstance(i, numbers.Integral) or not 0 <= i < len(self.table):
+                raise ValueError('no player at row %r' % (i,))
+            if not isinstance(new_value, numbers.Integral) or not isinstance(new_weight, numbers.Integral):
+                raise ValueError('value and weight of row %d must be integers' % i)
+
+        old_team = set(i for _, i in self.picks)
+        boundary = None
+        for i, (new_value, new_weight) in changes.items():
+            old_entry = (-self.keys[i], i)
+            del self.order[bisect.bisect_left(self.order, old_entry)]
+            self.table.values[i] = new_value
+            self.table.weights[i] = new_weight
+            self.keys[i] = float(self.key_function(self.table[i]))
+            new_entry = (-self.keys[i], i)
+            bisect.insort(self.order, new_entry)
+            # Nothing before the first changed place in the old or new order is affected
+            first = min(old_entry, new_entry)
+            if boundary is None or first < boundary:
+                boundary = first
+        if boundary is not None:
+            self.repair(boundary)
+
+        new_team = set(i for _, i in self.picks)
+        return [self.table[i] for i in sorted(old_team - new_team)], \
+               [self.table[i] for i in sorted(new_team - old_team)]
+
+    def repair(self, boundary=None):
+        """
+        Redo the greedy selection from a (-key, row) pair of the sorted order on
+
+        Picks before boundary are kept, the rest of the order is scanned again.
+        With no boundary the whole selection is redone.
+        """
+        max_position = [MAX_POSITION[p] for p in POSITIONS]
+        positions = self.table.positions
+        weights = self.table.weights
+        if boundary is None:
+            start, picks = 0, []
+        else:
+            start = bisect.bisect_left(self.order, boundary)
+            picks = [entry for entry in self.picks if entry < boundary]
+
+        headcount = [0] * len(POSITIONS)
+        total_weight = 0
+        for _, i in picks:
+            headcount[positions[i]] += 1
+            total_weight += int(weights[i])
+
+        for index in range(start, len(self.order)):
+            if len(picks) >= MAX_PLAYERS:
+                break
+            i = self.order[index][1]
+            p = positions[i]
+            if headcount[p] < max_position[p] and total_weight + int(weights[i]) <= self.max_weight:
+                picks.append(self.order[index])
+                headcount[p] += 1
+                total_weight += int(weights[i])
+        self.picks = picks
+
 ###########################################
 # Player class for greedy heuristics
 
@@ -223,6 +641,160 @@ class Player(object):
     __repr__ = __str__ # nice representation of objects in eg lists
 
 
+# positions in the order they appear on the website, PlayerTable stores their index
+POSITIONS = ['Goalkeeper', 'Defender', 'Midfielder', 'Forward']
+
+
+class PlayerTable(object):
+    """
+    Columnar player table for knapsack problems
+
+    Holds the same data as a list of Players, but one typed array per attribute:
+    team codes, position codes (index into POSITIONS), values and weights. Names
+    are kept as one UTF-8 bytes string with an array of where each one starts.
+    With 100k players (17 character names) this takes 3.2 MB, against 24 MB for
+    the list of Players.
+    get_value() and get_weight() return the whole column, so the key functions
+    (value, weight_inverse, density) work on every player at once.
+
+    Indexing the table returns a lightweight PlayerView of a single row.
+
+    Example use:
+    >>> players = [Player('A', 'X', 10, 5, 'Forward'), Player('B', 'Y', 12, 3, 'Defender')]
+    >>> table = PlayerTable.from_players(players)
+    >>> len(table)
+    2
+    >>> density(table).tolist()
+    [2.0, 4.0]
+    >>> table[1]
+    <B, Defender, Y, 12, 3>
+    >>> sort_items(table, density)
+    [<B, Defender, Y, 12, 3>, <A, Forward, X, 10, 5>]
+    """
+    def __init__(self, names, teams, positions, values, weights):
+        import numpy as np
+
+        encoded = [name.encode('utf8') for name in names]
+        self.name_data = b''.join(encoded)
+        offset_type = np.uint32 if len(self.name_data) < 2 ** 32 else np.int64
+        self.name_offsets = np.zeros(len(encoded) + 1, dtype=offset_type)
+        np.cumsum([len(name) for name in encoded], out=self.name_offsets[1:])
+        self.team_names = sorted(set(teams))
+        team_codes = {t: i for i, t in enumerate(self.team_names)}
+        self.teams = np.array([team_codes[t] for t in teams], dtype=np.uint16)
+        self.positions = np.array([POSITIONS.index(p) for p in positions], dtype=np.uint8)
+        self.values = np.array(values, dtype=np.int32)
+        self.weights = np.array(weights, dtype=np.int32)
+
+    @classmethod
+    def from_players(cls, players):
+        """
+        Create a table from a list of Player objects
+        """
+        return cls([pl.name for pl in players],
+                   [pl.team for pl in players],
+                   [pl.position for pl in players],
+                   [pl.value for pl in players],
+                   [pl.weight for pl in players])
+
+    def get_value(self):
+        return self.values
+
+    def get_weight(self):
+        return self.weights
+
+    def argsort(self, key_function):
+        """
+        Returns the row indices sorted by key_function, highest first
+
+        The key is evaluated once over the whole table; ties keep table order
+        (same as sorted(..., reverse=True) on a list of Players)
+        """
+        import numpy as np
+
+        keys = np.asarray(key_function(self), dtype=np.float64)
+        return np.argsort(-keys, kind='stable')
+
+    def name_of(self, index):
+        """
+        Returns the name of the player in row index
+        """
+        start, stop = self.name_offsets[index], self.name_offsets[index + 1]
+        return self.name_data[start:stop].decode('utf8')
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('player index out of range')
+        return PlayerView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield PlayerView(self, index)
+
+
+class PlayerView(object):
+    """
+    Read-only view of one row of a PlayerTable
+
+    Behaves like a Player (same getters, attributes and string form) but only
+    stores the table and the row index.
+    """
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    @property
+    def name(self):
+        return self.table.name_of(self.index)
+
+    @property
+    def team(self):
+        return self.table.team_names[self.table.teams[self.index]]
+
+    @property
+    def position(self):
+        return POSITIONS[self.table.positions[self.index]]
+
+    @property
+    def value(self):
+        return int(self.table.values[self.index])
+
+    @property
+    def weight(self):
+        return int(self.table.weights[self.index])
+
+    def get_name(self):
+        return self.name
+
+    def get_value(self):
+        return self.value
+
+    def get_position(self):
+        return self.position
+
+    def get_weight(self):
+        return self.weight
+
+    def __eq__(self, other):
+        return isinstance(other, PlayerView) and self.table is other.table and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.table), self.index))
+
+    def __str__(self):
+        return '<' + self.name + ', ' + self.position + ', ' + self.team + ', ' + str(self.value) \
+               + ', ' + str(self.weight) + '>'
+
+    __repr__ = __str__
+
+
 ###########################################
 # Helper functions for greedy heuristics
 
@@ -233,13 +805,12 @@ def create_player_list(players):
     """
 
     wages = [float(i[3][1:]) for i in players]
-    pos = ['Goalkeeper', 'Defender', 'Midfielder', 'Forward']
     pos_index = 0
     # Hack to add correct position. Exploits the ordering on the website (position, wage). Very fragile!
     for i, pl in enumerate(players):
         if i > 0 and wages[i] > wages[i - 1]:
             pos_index += 1
-        pl.append(pos[pos_index])
+        pl.append(POSITIONS[pos_index])
 
     # Create list of players. Convert wage to integer value.
     player_list = [Player(n, t, int(v), int(10 * float(w[1:])), p) for (n, t, v, w, p) in players]
@@ -247,13 +818,17 @@ def create_player_list(players):
     return player_list
 
 
-def read_players(html):
+def read_players(html, cache=True):
     """
     Get player data from HTML file
 
     Assumes html is a webpage formatted like https://fantasy.premierleague.com/player-list/
     
     These are ordered by position and wage
+
+    The table rows are parsed once and cached next to the HTML file, keyed by
+    the file's hash, so reading an unchanged page again skips the parsing.
+    Pass cache=False to always parse.
     
     We could use the requests library to download the data:
     >>> import requests
@@ -262,18 +837,96 @@ def read_players(html):
     ...     data = f.write(r.text) # save html to file (only if we need it later, normally we would skip this)
     >>> read_players('test.html')
     """
-    with open(html, 'r', encoding='utf-8') as f:
-        data = f.read()
-    soup = BeautifulSoup(data, 'lxml')
-
-    # Read HTML table with soup
-    players = []
-    for tr in soup.find_all('tr'):
-        row = tr.find_all('td')
-        if len(row) > 0:
-            players.append([elem.text for elem in row])
+    if cache:
+        cache_file = player_cache_file(html)
+        players = load_player_cache(cache_file)
+        if players is None:
+            players = list(iter_player_rows(html))
+            save_player_cache(cache_file, players)
+    else:
+        players = list(iter_player_rows(html))
 
     # Get players as list
     player_list = create_player_list(players)
 
-    return player_list, players
\ No newline at end of file
+    return player_list, players
+
+
+def iter_player_rows(html):
+    """
+    Stream the table rows of a player list HTML file
+
+    Uses lxml's incremental parser, so rows are emitted as they are read and
+    the document tree is never built in full. lxml is only imported here.
+
+    Returns:
+        generator of lists with the text of each cell, one list per table row
+        that has cells
+    """
+    from lxml import etree
+
+    for _, tr in etree.iterparse(html, events=('end',), tag='tr', html=True, encoding='utf-8'):
+        row = [''.join(td.itertext()) for td in tr.iter('td')]
+        if len(row) > 0:
+            yield row
+        # Drop the row and everything parsed before it, the tree stays small
+        tr.clear(keep_tail=True)
+        while tr.getprevious() is not None:
+            del tr.getparent()[0]
+
+
+def player_cache_file(html):
+    """
+    Name of the cache file for an HTML file, based on the hash of its contents
+    """
+    digest = hashlib.sha1()
+    with open(html, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    folder, name = os.path.split(os.path.abspath(html))
+    return os.path.join(folder, '.' + name + '.' + digest.hexdigest()[:16] + '.players')
+
+
+def load_player_cache(cache_file):
+    """
+    Load cached player rows, returns None if there is no (valid) cache
+
+    The cache is plain JSON, so a file we didn't write can't run any code;
+    anything unreadable or not shaped like a list of rows of strings is a miss.
+    """
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            players = json.load(f)
+    except Exception:
+        return None
+    if not isinstance(players, list) or \
+            not all(isinstance(row, list) and all(isinstance(cell, str) for cell in row) for row in players):
+        return None
+    return players
+
+
+def save_player_cache(cache_file, players):
+    """
+    Save player rows to the cache file, silently skipped if it can't be written
+
+    Cache files of earlier versions of the same HTML file are removed.
+    """
+    tmp_file = cache_file + '.tmp'
+    try:
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(players, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        return
+
+    # Old caches: same '.<name>.' prefix and '.players' suffix, a different hash
+    folder, cache_name = os.path.split(cache_file)
+    prefix = cache_name[:-len('.players') - 16]
+    for name in os.listdir(folder):
+        digest = name[len(prefix):-len('.players')]
+        if name != cache_name and name.startswith(prefix) and name.endswith('.players') \
+                and len(digest) == 16 and all(c in '0123456789abcdef' for c in digest):
+            try:
+                os.remove(os.path.join(folder, name))
+            except OSError:
+                pass
@@ -6,7 +6,23 @@ Practice Exercises for Python
 String Manipulation on a Palindrome
 Ernesto Monroy
 
+palindrome works on one number at a time. palindrome_batch solves many numbers
+at once: numbers of the same length are packed into a matrix of digits, and
+each step of the algorithm runs on a whole column of the matrix.
+palindrome_buffer and palindrome_file handle a single very long number, held in
+a bytes-like object or a file, a chunk at a time and without extra copies.
+These need numpy, which is only imported when one of them is first called.
+
+Run as a script to solve a file with one 's k' case per line, or one long number:
+    python Palindrome.py cases.txt -o results.txt
+    python Palindrome.py number.txt --long 1000 -o palindrome.txt
+
 """
+import argparse
+import mmap
+import sys
+
+NOT_POSSIBLE = 'Not possible.'
 
 def palindrome(s, k):
     """
@@ -29,25 +45,27 @@ def palindrome(s, k):
     'Not possible.'
     >>> palindrome('11119111', 4)
     '91199119'
+    >>> palindrome('1111111', 1)
+    '1119111'
     """
     # Your code here.
     
     #Counter
     spareMoves=k
     #Loop to find how many spare moves we got (to meet minimum)
-    for i in range(0, round(len(s)/2)):
+    for i in range(0, len(s)//2):
         if s[i]!=s[-i-1]:
             spareMoves+=-1
     
     #If not enough changes available alert
     if spareMoves<0:
-        return 'Not possible.'
+        return NOT_POSSIBLE
     
     #Convert string to list so we can easily replace
     stringList=list(map(int,list(s)))
 
     #Loop to execute changes
-    for i in range(0, round(len(stringList)/2)):  
+    for i in range(0, len(stringList)//2):
         #If I can optimize and have enough changes then change one to 9 (the other one is changed in the next if
         #(For equal numbers we need 2 spare moves since we didnt account for changing in the minumum moves)
         if max(stringList[i],stringList[-i-1])<9 and spareMoves>=(1+int(stringList[i]==stringList[-i-1])):
@@ -63,6 +81,376 @@ def palindrome(s, k):
     
     #If there is an odd middle number and it can be optimized (no need to check for max(i,-i) since we are no longer wasting moves)
     if (len(s)%2==1 and spareMoves>0):
-        stringList[round(len(s)/2)]=9
+        stringList[len(s)//2]=9
     
-    return "".join(map(str,stringList))        
\ No newline at end of file
+    return "".join(map(str,stringList))
+
+
+def palindrome_matrix(digits, k):
+    """
+    Highest-value palindromes for a batch of numbers of the same length
+
+    Same algorithm as palindrome, but every step is done for all rows at once.
+
+    Parameters:
+        digits - matrix of digits (0-9), one number per row
+        k - array with the number of changes for each row
+
+    Returns:
+        uint8 matrix with the palindrome for each row
+        boolean array, False for the rows where creating a palindrome is not possible
+
+    Example use:
+    >>> pals, possible = palindrome_matrix([[1, 9, 2, 1], [1, 9, 2, 1]], [2, 1])
+    >>> pals.tolist(), possible.tolist()
+    ([[1, 9, 9, 1], [1, 9, 9, 1]], [True, True])
+    """
+    import numpy as np
+
+    # Column-major copy, so every column below is a contiguous array
+    result = np.array(digits, dtype=np.uint8, order='F', ndmin=2)
+    n = result.shape[1]
+    half = n // 2
+    left = result[:, :half]
+    right = result[:, ::-1][:, :half]  # right[:, i] is the pair of left[:, i]
+
+    # Spare moves after making every pair match
+    spare = np.asarray(k, dtype=np.int64) - np.count_nonzero(left != right, axis=1)
+    possible = spare >= 0
+
+    for i in range(half):
+        l = left[:, i]
+        r = right[:, i]
+        top = np.maximum(l, r)
+        # Changing a matched pair to 9 takes 2 moves, a mismatched pair only 1 more
+        cost = 1 + (l == r)
+        upgrade = possible & (top < 9) & (spare >= cost)
+        spare -= cost * upgrade
+        top[upgrade] = 9
+        l[:] = top
+        r[:] = top
+
+    # Odd middle digit: any spare move makes it a 9
+    if n % 2 == 1:
+        result[possible & (spare > 0), half] = 9
+    return result, possible
+
+
+def palindrome_batch(numbers, k):
+    """
+    Highest-value palindromes for many numbers
+
+    Numbers are grouped by length, and each group is solved with palindrome_matrix.
+
+    Parameters:
+        numbers - list of integers in string (or bytes) format
+        k - list with the number of changes for each number
+
+    Returns:
+        list of bytes with the palindrome for each number, or b'Not possible.'
+
+    Example use:
+    >>> palindrome_batch(['1921', '1921', '11122', '11119111'], [2, 3, 1, 4])
+    [b'1991', b'9999', b'Not possible.', b'91199119']
+    """
+    import numpy as np
+
+    numbers = [x.encode('ascii') if isinstance(x, str) else bytes(x) for x in numbers]
+    k = np.asarray(k, dtype=np.int64)
+    if len(k) != len(numbers):
+        raise ValueError('numbers and k are not the same size')
+    not_possible = NOT_POSSIBLE.encode('ascii')
+
+    # Indices of the numbers of each length
+    by_length = {}
+    for index, number in enumerate(numbers):
+        by_length.setdefault(len(number), []).append(index)
+
+    result = [None] * len(numbers)
+    for length, indices in by_length.items():
+        raw = np.frombuffer(b''.join([numbers[i] for i in indices]), dtype=np.uint8)
+        digits = (raw - ord('0')).reshape(len(indices), length)
+        if (digits > 9).any():
+            raise ValueError('numbers must only contain digits')
+        pals, possible = palindrome_matrix(digits, k[indices])
+        out = (np.ascontiguousarray(pals) + ord('0')).tobytes()
+        for row, (index, ok) in enumerate(zip(indices, possible.tolist())):
+            result[index] = out[row * length:(row + 1) * length] if ok else not_possible
+    return result
+
+
+def palindrome_lines(block):
+    """
+    Solve a block of 's k' lines, one case per line
+
+    The block is parsed, solved and written back as whole arrays: no Python
+    object is created per case. Empty lines are skipped.
+
+    Parameters:
+        block - bytes with complete lines ('s k' separated by one space)
+
+    Returns:
+        bytes with one result line per case
+
+    Example use:
+    >>> palindrome_lines(b'1921 2\\n11122 1\\n\\n11119111 4\\n')
+    b'1991\\nNot possible.\\n91199119\\n'
+    """
+    import numpy as np
+
+    buf = np.frombuffer(block, dtype=np.uint8)
+    if len(buf) == 0:
+        return b''
+    ends = np.flatnonzero(buf == ord('\n'))
+    if len(buf) and buf[-1] != ord('\n'):
+        ends = np.append(ends, len(buf))
+    starts = np.concatenate(([0], ends[:-1] + 1)).astype(np.int64)
+    # Drop windows line endings and empty lines
+    ends = ends - (buf[np.maximum(ends - 1, 0)] == ord('\r')) * (ends > starts)
+    keep = ends > starts
+    starts, ends = starts[keep], ends[keep]
+    if len(starts) == 0:
+        return b''
+
+    # Separator: first space of each line
+    space_at = np.flatnonzero(buf == ord(' '))
+    seps = space_at[np.minimum(np.searchsorted(space_at, starts), len(space_at) - 1)] \
+        if len(space_at) else np.full(len(starts), -1)
+    if (seps < starts).any() or (seps >= ends - 1).any():
+        raise ValueError("every line must be 's k'")
+    lengths = seps - starts
+
+    # Parse k, one digit column at a time
+    k_lengths = ends - seps - 1
+    k = np.zeros(len(starts), dtype=np.int64)
+    for j in range(k_lengths.max()):
+        has_digit = j < k_lengths
+        digit = buf[np.where(has_digit, seps + 1 + j, 0)].astype(np.int64) - ord('0')
+        if ((digit[has_digit] < 0) | (digit[has_digit] > 9)).any():
+            raise ValueError('k must be a non-negative integer')
+        k = np.where(has_digit, k * 10 + digit, k)
+
+    # Solve each group of numbers with the same length
+    not_possible = np.frombuffer(NOT_POSSIBLE.encode('ascii'), dtype=np.uint8)
+    pals_by_length = {}
+    possible = np.zeros(len(starts), dtype=bool)
+    for length in np.unique(lengths).tolist():
+        rows = np.flatnonzero(lengths == length)
+        digits = buf[starts[rows, None] + np.arange(length)] - ord('0')
+        if (digits > 9).any():
+            raise ValueError('numbers must only contain digits')
+        pals, possible[rows] = palindrome_matrix(digits, k[rows])
+        pals_by_length[length] = rows, pals
+
+    # Write every result line in place in the output buffer
+    out_lengths = np.where(possible, lengths, len(not_possible)) + 1
+    out_ends = np.cumsum(out_lengths)
+    out_starts = out_ends - out_lengths
+    out = np.empty(out_ends[-1], dtype=np.uint8)
+    out[out_ends - 1] = ord('\n')
+    for length, (rows, pals) in pals_by_length.items():
+        ok = possible[rows]
+        out[out_starts[rows[ok], None] + np.arange(length)] = pals[ok] + ord('0')
+    failed = np.flatnonzero(~possible)
+    out[out_starts[failed, None] + np.arange(len(not_possible))] = not_possible
+    return out.tobytes()
+
+
+def palindrome_stream(infile, outfile, chunk_size=1 << 22):
+    """
+    Solve a stream of 's k' lines, writing one result line per case
+
+    The input is read chunk_size bytes at a time, and each chunk of complete
+    lines is solved with palindrome_lines.
+
+    Parameters:
+        infile - binary file with one 's k' case per line
+        outfile - binary file to write the results to
+        chunk_size - bytes read for each batch
+    """
+    rest = b''
+    while True:
+        chunk = infile.read(chunk_size)
+        if not chunk:
+            break
+        chunk = rest + chunk
+        cut = chunk.rfind(b'\n') + 1
+        rest = chunk[cut:]
+        if cut:
+            outfile.write(palindrome_lines(chunk[:cut]))
+    if rest:
+        outfile.write(palindrome_lines(rest))
+
+
+def palindrome_buffer(data, k, out=None, chunk_size=1 << 20):
+    """
+    Highest-value palindrome for a very long number in a bytes-like object
+
+    Same result as palindrome, but the digits are read straight from data
+    (bytes, bytearray, mmap, memoryview) and processed chunk_size pairs at a
+    time, so the only full-size buffer is the output.
+
+    Parameters:
+        data - the number as ASCII digits
+        k - number of changes
+        out - writable buffer of the same length for the result; pass data
+              itself to change it in place (default: a new bytearray)
+        chunk_size - number of digit pairs processed at a time
+
+    Returns:
+        out with the palindrome, or b'Not possible.' (and out is not changed)
+
+    Example use:
+    >>> palindrome_buffer(b'11119111', 4, chunk_size=3)
+    bytearray(b'91199119')
+    >>> number = bytearray(b'1921')
+    >>> palindrome_buffer(number, 3, out=number) is number
+    True
+    >>> number
+    bytearray(b'9999')
+    >>> palindrome_buffer(b'11122', 1)
+    b'Not possible.'
+    >>> palindrome_buffer(b'12 21', 0)
+    Traceback (most recent call last):
+    ...
+    ValueError: number must only contain digits
+    """
+    import numpy as np
+
+    digits = np.frombuffer(data, dtype=np.uint8)
+    n = len(digits)
+    half = n // 2
+    nine = ord('9')
+
+    # First pass: check digits and count the pairs that don't match
+    mismatches = 0
+    for start in range(0, half, chunk_size):
+        stop = min(half, start + chunk_size)
+        left = digits[start:stop]
+        right = digits[n - stop:n - start][::-1]
+        if ((left - ord('0')) > 9).any() or ((right - ord('0')) > 9).any():
+            raise ValueError('number must only contain digits')
+        mismatches += int(np.count_nonzero(left != right))
+    if n % 2 == 1 and ((digits[half:half + 1] - ord('0')) > 9).any():
+        raise ValueError('number must only contain digits')
+    spare = k - mismatches
+    if spare < 0:
+        return NOT_POSSIBLE.encode('ascii')
+
+    if out is None:
+        out = bytearray(n)
+    result = np.frombuffer(out, dtype=np.uint8)
+    if len(result) != n:
+        raise ValueError('out must be the same length as data')
+
+    # Second pass: same greedy as palindrome, outermost pairs first
+    for start in range(0, half, chunk_size):
+        stop = min(half, start + chunk_size)
+        left = digits[start:stop]
+        right = digits[n - stop:n - start][::-1]
+        top = np.maximum(left, right)
+        # Changing a matched pair to 9 takes 2 moves, a mismatched pair only 1 more
+        cost = np.where(top < nine, 1 + (left == right), 0)
+        # Pairs are upgraded while the moves last...
+        used = np.cumsum(cost)
+        upgrade = (cost > 0) & (used <= spare)
+        spare -= int(cost[upgrade].sum())
+        # ...and with one move left after a 2-move pair, the next 1-move pair still can be
+        if spare == 1:
+            first_miss = np.flatnonzero((cost > 0) & ~upgrade)
+            if len(first_miss):
+                cheap = np.flatnonzero(cost[first_miss[0]:] == 1)
+                if len(cheap):
+                    upgrade[first_miss[0] + cheap[0]] = True
+                    spare = 0
+        top[upgrade] = nine
+        result[start:stop] = top
+        result[n - stop:n - start] = top[::-1]
+
+    # Odd middle digit: any spare move makes it a 9
+    if n % 2 == 1:
+        result[half] = nine if spare > 0 else digits[half]
+    return out
+
+
+def palindrome_file(path, k, out_path=None, chunk_size=1 << 20):
+    """
+    Highest-value palindrome for a number stored in a file
+
+    The input is memory-mapped and solved with palindrome_buffer, writing
+    straight into a memory-mapped output file (or into the input file itself
+    when out_path is None). Trailing newlines are kept as they are.
+
+    Parameters:
+        path - file with the number as ASCII digits
+        k - number of changes
+        out_path - file to write the palindrome to (None: change path in place)
+        chunk_size - number of digit pairs processed at a time
+
+    Returns:
+        True if the palindrome was written, False if it is not possible
+        (then path is not changed, and out_path contains 'Not possible.')
+    """
+    in_place = out_path is None
+    with open(path, 'r+b' if in_place else 'rb') as f:
+        size = f.seek(0, 2)
+        if size == 0:
+            if not in_place:
+                open(out_path, 'wb').close()
+            return True
+        mode = mmap.ACCESS_WRITE if in_place else mmap.ACCESS_READ
+        with mmap.mmap(f.fileno(), 0, access=mode) as data:
+            n = size
+            while n > 0 and data[n - 1] in b'\r\n':
+                n -= 1
+            view = memoryview(data)[:n]
+            try:
+                if in_place:
+                    return palindrome_buffer(view, k, out=view, chunk_size=chunk_size) is view
+                with open(out_path, 'w+b') as g:
+                    g.truncate(size)
+                    with mmap.mmap(g.fileno(), size) as out:
+                        out[n:] = data[n:]
+                        out_view = memoryview(out)[:n]
+                        try:
+                            if palindrome_buffer(view, k, out=out_view, chunk_size=chunk_size) is out_view:
+                                return True
+                        finally:
+                            out_view.release()
+                    g.truncate(0)
+                    g.write(NOT_POSSIBLE.encode('ascii'))
+                    return False
+            finally:
+                view.release()
+
+
+def main(argv=None):
+    """
+    Command line: solve a file of 's k' cases, or one long number with --long K
+    """
+    parser = argparse.ArgumentParser(description='Highest-value palindromes for a file of cases')
+    parser.add_argument('input', help="file with one 's k' case per line, '-' for stdin")
+    parser.add_argument('-o', '--output', default='-', help="file to write the results to, '-' for stdout")
+    parser.add_argument('--chunk', type=int, default=1 << 22, help='bytes read for each batch')
+    parser.add_argument('--long', type=int, metavar='K',
+                        help='input is a single long number, solved with K changes (needs -o)')
+    args = parser.parse_args(argv)
+
+    if args.long is not None:
+        if args.input == '-' or args.output == '-':
+            parser.error('--long works on files: give an input file and -o')
+        return 0 if palindrome_file(args.input, args.long, args.output) else 1
+
+    infile = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+    outfile = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        palindrome_stream(infile, outfile, args.chunk)
+    finally:
+        if infile is not sys.stdin.buffer:
+            infile.close()
+        if outfile is not sys.stdout.buffer:
+            outfile.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
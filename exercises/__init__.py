@@ -0,0 +1,10 @@
+"""
+
+Practice Exercises for Python
+Ernesto Monroy
+
+Knapsack, Network Analysis, Palindrome and Trading exercises. The modules are
+not imported here, so importing the package (or running its command line
+tools) stays fast; see exercises.cli.
+
+"""
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+
+Practice Exercises for Python
+Command Line Tools
+Ernesto Monroy
+
+Console commands for the exercises:
+    bacon-distance   distance from Kevin Bacon in the movie network
+    trade-backtest   moving average crossover trading on a price file
+    lineup           fantasy football team from a player list page
+    palindrome       highest-value palindromes
+
+The exercise modules (and numpy, lxml, the movie data...) are only imported or
+loaded inside the command that needs them, so --help and light commands start
+quickly. With --timing each run reports how long it took; with --repeat N the
+first run is the cold one (imports and data loads included) and the rest are
+warm runs reusing what was loaded.
+
+"""
+import argparse
+import io
+import sys
+import time
+
+
+####
+# Commands: each returns the text to print, or an exit status (int) on failure.
+# They don't write to stdout themselves, so --repeat only prints the first run
+
+def run_bacon_distance(args):
+    """
+    Distance from Kevin Bacon to an actor, or Kevin's longest connection
+    """
+    from .network_analysis import Network
+
+    metrics = None
+    if args.metrics is not None:
+        from .network_analysis.TraversalMetrics import TraversalMetrics
+        metrics = TraversalMetrics(textfile=args.metrics, hub_threshold=args.hub_threshold)
+    filename = args.movies or Network.MOVIES_FILE
+    if args.actor is None:
+        longest, distance = Network.find_kevins_longest_connection(filename, metrics)
+        return '%s\nDistance: %d (Bacon number %d)' % (longest, distance, distance // 2)
+
+    graph = Network.load_movie_data(filename)
+    if not graph.has_node(args.start):
+        raise SystemExit('error: %r is not in the movie data' % args.start)
+    dists, prev_nodes = Network.breadthFirstSearch(graph, args.start, metrics)
+    if args.actor not in dists:
+        return '%s is not connected to %s' % (args.actor, args.start)
+    path = []
+    v = args.actor
+    while v is not None:
+        path.append(v)
+        v = prev_nodes[v]
+    distance = dists[args.actor]
+    return '%s\nDistance: %d (Bacon number %d)' % (' -> '.join(path), distance, distance // 2)
+
+
+def run_trade_backtest(args):
+    """
+    Moving average crossover trading on a file of prices
+    """
+    from . import Trading
+
+    with open(args.prices, 'r', encoding='utf-8') as f:
+        prices = [float(p) for p in f.read().replace(',', ' ').split()]
+    short_ma = Trading.moving_average(prices, args.short)
+    long_ma = Trading.moving_average(prices, args.long)
+    crossovers = Trading.cross_overs(short_ma, long_ma)
+    values = Trading.make_trades(args.cash, prices, crossovers)
+    return 'Trades: %d\nFinal value: %.2f' % (len(crossovers), values[-1] if values else args.cash)
+
+
+def run_lineup(args):
+    """
+    Best teams from a player list page
+    """
+    from . import Knapsack
+
+    key_function = getattr(Knapsack, args.key)
+    player_list, _ = Knapsack.read_players(args.html)
+    table = Knapsack.PlayerTable.from_players(player_list)
+    if args.top == 1 and args.max_overlap is None:
+        team, total_value = Knapsack.greedy_heuristic(table, args.budget, key_function)
+        lineups = [(team, total_value, sum(player.get_weight() for player in team))]
+    else:
+        lineups = Knapsack.top_lineups(table, args.budget, key_function, args.top,
+                                       max_overlap=args.max_overlap, processes=args.processes)
+    if not lineups:
+        return 'No full team found within the budget'
+    lines = []
+    for rank, (team, total_value, total_weight) in enumerate(lineups, 1):
+        lines.append('#%d value %s, weight %s' % (rank, total_value, total_weight))
+        lines.extend('  ' + str(player) for player in team)
+    return '\n'.join(lines)
+
+
+def run_palindrome(args):
+    """
+    One palindrome, a file of cases, or one long number in a file
+    """
+    from . import Palindrome
+
+    if args.file is None:
+        if args.number is None or args.k is None:
+            raise SystemExit('error: give NUMBER K, or --file')
+        return Palindrome.palindrome(args.number, args.k)
+    if args.long is not None:
+        if args.output is None:
+            raise SystemExit('error: --long needs -o')
+        # the output file says 'Not possible.', the exit status says it too
+        return None if Palindrome.palindrome_file(args.file, args.long, args.output) else 1
+    with open(args.file, 'rb') as infile:
+        if args.output is None:
+            # returned rather than written, so only the first run prints it
+            results = io.BytesIO()
+            Palindrome.palindrome_stream(infile, results)
+            return results.getvalue().decode('ascii').rstrip('\n')
+        with open(args.output, 'wb') as outfile:
+            Palindrome.palindrome_stream(infile, outfile)
+    return None
+
+
+####
+# Argument parsing
+
+def build_parser():
+    """
+    Argument parser with one sub-command per exercise
+    """
+    # options shared by all commands
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--timing', action='store_true', help='report the time of each run on stderr')
+    common.add_argument('--repeat', type=int, default=1, help='run the command N times (1 cold, N-1 warm)')
+
+    parser = argparse.ArgumentParser(prog='exercises', description='Python exercises command line tools')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    bacon = commands.add_parser('bacon-distance', parents=[common],
+                                help='distance from Kevin Bacon in the movie network')
+    bacon.add_argument('actor', nargs='?', help="actor name as 'Last, First' (default: Kevin's longest connection)")
+    bacon.add_argument('--start', default='Bacon, Kevin', help='actor to measure the distance from')
+    bacon.add_argument('--movies', help='movie data file (default: the one shipped with the package)')
+    bacon.add_argument('--metrics', metavar='FILE', help='write search metrics to a Prometheus text file')
+    bacon.add_argument('--hub-threshold', type=int, default=100,
+                       help='with --metrics, report nodes with at least this many connections')
+    bacon.set_defaults(run=run_bacon_distance)
+
+    trade = commands.add_parser('trade-backtest', parents=[common],
+                                help='moving average crossover trading on a price file')
+    trade.add_argument('prices', help='file with prices in time order, separated by spaces, commas or lines')
+    trade.add_argument('--short', type=int, default=3, help='short moving average periods')
+    trade.add_argument('--long', type=int, default=10, help='long moving average periods')
+    trade.add_argument('--cash', type=float, default=1000.0, help='starting cash')
+    trade.set_defaults(run=run_trade_backtest)
+
+    lineup = commands.add_parser('lineup', parents=[common],
+                                 help='fantasy football team from a player list page')
+    lineup.add_argument('html', help='player list HTML file')
+    lineup.add_argument('--budget', type=float, default=900, help='max total wage')
+    lineup.add_argument('--key', choices=['density', 'value', 'weight_inverse'], default='density',
+                        help='function to sort players with')
+    lineup.add_argument('--top', type=int, default=1, help='number of lineups')
+    lineup.add_argument('--max-overlap', type=int, help='max players two lineups can share')
+    lineup.add_argument('--processes', type=int, help='worker processes for --top (default: one per CPU)')
+    lineup.set_defaults(run=run_lineup)
+
+    pal = commands.add_parser('palindrome', parents=[common], help='highest-value palindromes')
+    pal.add_argument('number', nargs='?', help='number to change')
+    pal.add_argument('k', nargs='?', type=int, help='number of changes')
+    pal.add_argument('--file', help="file with one 's k' case per line (or one long number with --long)")
+    pal.add_argument('--long', type=int, metavar='K', help='--file holds one long number, solved with K changes')
+    pal.add_argument('-o', '--output', help='file to write the results to (default: stdout)')
+    pal.set_defaults(run=run_palindrome)
+
+    return parser
+
+
+def main(argv=None):
+    """
+    Run a command, reporting per-run timings with --timing
+    """
+    args = build_parser().parse_args(argv)
+    status = 0
+    for run in range(max(1, args.repeat)):
+        start = time.perf_counter()
+        output = args.run(args)
+        elapsed = time.perf_counter() - start
+        if isinstance(output, int):
+            status = output
+        # Only the first run prints its result, the others are just timed
+        elif run == 0 and output is not None:
+            print(output)
+        if args.timing:
+            print('%s run %d (%s): %.1f ms' % (args.command, run + 1, 'cold' if run == 0 else 'warm',
+                                               elapsed * 1000), file=sys.stderr)
+    return status
+
+
+def command(name):
+    """
+    Console entry point running a single command, eg bacon-distance
+    """
+    def entry_point(argv=None):
+        return main([name] + list(sys.argv[1:] if argv is None else argv))
+    return entry_point
+
+
+bacon_distance = command('bacon-distance')
+trade_backtest = command('trade-backtest')
+lineup = command('lineup')
+palindrome = command('palindrome')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -15,18 +15,29 @@ At the end, this concept is applied to the analysis of movie data to find the
 maximum distance between Kevin Bacon and any other actor in the list.
 
 """
-from GraphStructures import Graph, Queue
+import functools
+import os
+import time
+
+try:
+    from .GraphStructures import Graph, Queue
+except ImportError:  # run as a script from this folder
+    from GraphStructures import Graph, Queue
+
+# Movie data shipped next to this file
+MOVIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'movies.txt')
 
 #### 
 # Search Algorithms
 
-def breadthFirstSearch(graph, start):
+def breadthFirstSearch(graph, start, metrics=None):
     """ 
     Breadth-first search using Queue data structure, keeping track of paths
     
     Parameter: 
         graph (Digraph/Graph), 
         start: starting node in the graph
+        metrics: optional TraversalMetrics, to record the cost of the search
     
     Returns:
         dists, a dictionary of distances to all explored nodes:
@@ -40,6 +51,9 @@ def breadthFirstSearch(graph, start):
     >>> [prev_nodes['Donald'], prev_nodes['Helena'], prev_nodes['John']]
     ['Jared', 'John', None]
     """
+    # Instrumented copy of this search, so it costs nothing when not asked for
+    if metrics is not None:
+        return instrumented_breadth_first_search(graph, start, metrics)
     
     # Keep track of queue of nodes to explore next
     q = Queue() # Initialize an empty queue
@@ -69,7 +83,7 @@ def breadthFirstSearch(graph, start):
                 q.enqueue(w) # Add w to queue to explore from in the future
     return dists, prev_nodes
 
-def depthFirstSearch(graph, start, explored = set(), prev_nodes = dict(), pop_order = dict()):
+def depthFirstSearch(graph, start, explored = None, prev_nodes = None, pop_order = None, metrics = None):
     """
     Depth first search on graph from node start using recursion
     
@@ -79,6 +93,7 @@ def depthFirstSearch(graph, start, explored = set(), prev_nodes = dict(), pop_or
         explored: nodes already explored (used only by the recursion)
         prev_nodes: nodes already travelled and distance (used only by the recursion)
         pop_order: order in which nodes are explored (used only by the recursion)
+        metrics: optional TraversalMetrics, to record the cost of the search
     Returns:
         prev_nodes: dictionary:
             key: node, value: node where this node was reached from
@@ -91,6 +106,20 @@ def depthFirstSearch(graph, start, explored = set(), prev_nodes = dict(), pop_or
     >>> abs(pop_order['Chris'] - pop_order['Helena']) > 1
     True
     """
+    #Fresh containers for a new search (the recursion passes its own)
+    if explored is None: explored = set()
+    if prev_nodes is None: prev_nodes = dict()
+    if pop_order is None: pop_order = dict()
+    #Instrumented copy of this search, so it costs nothing when not asked for
+    if metrics is not None:
+        metrics.start('dfs')
+        per_depth = []
+        result = instrumented_depth_first_search(graph, start, explored, prev_nodes, pop_order,
+                                                 metrics, 0, per_depth)
+        for depth, (nodes, edges) in enumerate(per_depth):
+            metrics.level(depth, nodes, edges)
+        metrics.finish()
+        return result
     #If the current position (start) is not explored, we havent completed searching
     #the graph
     if not start in explored:
@@ -110,13 +139,83 @@ def depthFirstSearch(graph, start, explored = set(), prev_nodes = dict(), pop_or
     #This will bubble up the recursion
     return explored, prev_nodes,pop_order
 
+#### 
+# Instrumented Search Algorithms (see TraversalMetrics)
+
+def instrumented_breadth_first_search(graph, start, metrics):
+    """
+    breadthFirstSearch, recording nodes, edges, queue length and time per level in metrics
+    """
+    metrics.start('bfs')
+    q = Queue()
+    q.enqueue(start)
+    explored = set()
+    explored.add(start)
+    dists = dict()
+    dists[start] = 0
+    prev_nodes= dict()
+    prev_nodes[start]=None
+    metrics.peak_queue_length = q.length
+
+    # Nodes come out of the queue level by level: close a level when the distance changes
+    level = 0
+    level_nodes = 0
+    level_edges = 0
+    level_started = time.perf_counter()
+    while not q.is_empty():
+        v = q.dequeue()
+        if dists[v] != level:
+            now = time.perf_counter()
+            metrics.level(level, level_nodes, metrics.edges_scanned - level_edges, now - level_started)
+            level = dists[v]
+            level_nodes = 0
+            level_edges = metrics.edges_scanned
+            level_started = now
+        children = graph.children_of(v)
+        metrics.node(v, len(children), level)
+        level_nodes += 1
+        for w in children:
+            if w not in explored:
+                explored.add(w)
+                dists[w] = dists[v]+1
+                prev_nodes[w]=v
+                q.enqueue(w)
+        if q.length > metrics.peak_queue_length:
+            metrics.peak_queue_length = q.length
+    metrics.level(level, level_nodes, metrics.edges_scanned - level_edges, time.perf_counter() - level_started)
+    metrics.finish()
+    return dists, prev_nodes
+
+def instrumented_depth_first_search(graph, start, explored, prev_nodes, pop_order, metrics, depth, per_depth):
+    """
+    depthFirstSearch recursion, counting nodes and edges per depth in per_depth
+    (a list of [nodes, edges]) and the deepest recursion in metrics
+    """
+    if not start in explored:
+        explored.add(start)
+        pop_order[start]=len(pop_order)+1
+        children = graph.children_of(start)
+        metrics.node(start, len(children), depth)
+        if len(per_depth) <= depth:
+            per_depth.append([0, 0])
+        per_depth[depth][0] += 1
+        per_depth[depth][1] += len(children)
+        if depth + 1 > metrics.peak_queue_length:
+            metrics.peak_queue_length = depth + 1
+        for v in children:
+            if not v in explored:
+                prev_nodes[v]=start
+                explored, prev_nodes,pop_order=instrumented_depth_first_search(
+                    graph, v, explored, prev_nodes, pop_order, metrics, depth + 1, per_depth)
+    return explored, prev_nodes,pop_order
+
 ##### 
 # Use Case: Length Kevin Bacons Longest Connection
     
-def find_kevins_longest_connection():
-    g = read_movie_data("movies.txt")
+def find_kevins_longest_connection(filename=MOVIES_FILE, metrics=None):
+    g = load_movie_data(filename)
     s = 'Bacon, Kevin'
-    dists, prev_nodes = breadthFirstSearch(g, s)
+    dists, prev_nodes = breadthFirstSearch(g, s, metrics)
     #Loop to find longest
     longest = None
     nodesToLongest=0
@@ -149,6 +248,15 @@ def read_movie_data(filename):
                 graph.add_edge(names[0], names[i])
     return graph
 
+@functools.lru_cache(maxsize=None)
+def load_movie_data(filename=MOVIES_FILE):
+    """
+    Same as read_movie_data, but the file is only read on the first call
+
+    Later calls with the same filename return the same Graph object
+    """
+    return read_movie_data(filename)
+
 def print_path(prev_nodes, v):
     """ 
     Based on bfs result prev_nodes, prints out path from starting node to v
@@ -0,0 +1,150 @@
+"""
+
+Practice Exercises for Python
+Network Analysis Metrics for graph traversals
+Ernesto Monroy
+
+"""
+import os
+import time
+
+
+class TraversalMetrics(object):
+    """
+    Counters for one graph traversal (breadthFirstSearch or depthFirstSearch)
+
+    Pass an instance as the metrics parameter of a search to record:
+        nodes_dequeued - nodes taken out of the queue (explored, for DFS)
+        edges_scanned - children looked at
+        peak_queue_length - largest Queue.length (deepest recursion, for DFS)
+        levels - one dict per level (BFS distance, DFS depth):
+            level, frontier (nodes of that level), edges, seconds (BFS only)
+        hubs - (node, degree) of the nodes with at least hub_threshold children
+        seconds - duration of the whole traversal
+
+    Each level, hub and the final summary are also sent as a dictionary to
+    callback (if given), and the totals are written in Prometheus text format
+    to textfile (if given) when the traversal finishes.
+    Searches called without metrics do none of this work.
+
+    Example use:
+    >>> from exercises.network_analysis.Network import breadthFirstSearch, create_sample_graph
+    >>> events = []
+    >>> metrics = TraversalMetrics(callback=events.append, hub_threshold=3)
+    >>> dists, prev_nodes = breadthFirstSearch(create_sample_graph(), 'John', metrics=metrics)
+    >>> metrics.nodes_dequeued, metrics.edges_scanned, metrics.peak_queue_length
+    (7, 16, 2)
+    >>> [(level['level'], level['frontier']) for level in metrics.levels]
+    [(0, 1), (1, 2), (2, 2), (3, 1), (4, 1)]
+    >>> sorted(metrics.hubs)
+    [('Chris', 3), ('Helena', 3), ('Jared', 3)]
+    >>> [event['event'] for event in events].count('level')
+    5
+
+    Each search starts afresh, so repeated calls report the same work:
+    >>> from exercises.network_analysis.Network import depthFirstSearch
+    >>> for _ in range(2):
+    ...     result = depthFirstSearch(create_sample_graph(), 'John', metrics=metrics)
+    ...     print(metrics.nodes_dequeued, metrics.edges_scanned, len(metrics.levels))
+    7 16 6
+    7 16 6
+    """
+    def __init__(self, callback=None, textfile=None, hub_threshold=None):
+        self.callback = callback
+        self.textfile = textfile
+        self.hub_threshold = hub_threshold
+        self.traversal = None
+        self.nodes_dequeued = 0
+        self.edges_scanned = 0
+        self.peak_queue_length = 0
+        self.levels = []
+        self.hubs = []
+        self.seconds = 0.0
+        self.started = None
+
+    def start(self, traversal):
+        """
+        Reset the counters at the start of a traversal ('bfs' or 'dfs')
+        """
+        self.__init__(self.callback, self.textfile, self.hub_threshold)
+        self.traversal = traversal
+        self.started = time.perf_counter()
+
+    def level(self, level, frontier, edges, seconds=None):
+        """
+        Record a finished level
+        """
+        record = {'level': level, 'frontier': frontier, 'edges': edges, 'seconds': seconds}
+        self.levels.append(record)
+        self.emit('level', **record)
+
+    def node(self, node, degree, level):
+        """
+        Record a node being explored, noting it if it is a hub
+        """
+        self.nodes_dequeued += 1
+        self.edges_scanned += degree
+        if self.hub_threshold is not None and degree >= self.hub_threshold:
+            self.hubs.append((node, degree))
+            self.emit('hub', node=node, degree=degree, level=level)
+
+    def finish(self):
+        """
+        Record the end of the traversal, send the summary and write the text file
+        """
+        self.seconds = time.perf_counter() - self.started
+        self.emit('summary', nodes_dequeued=self.nodes_dequeued, edges_scanned=self.edges_scanned,
+                  peak_queue_length=self.peak_queue_length, levels=len(self.levels),
+                  seconds=self.seconds)
+        if self.textfile is not None:
+            self.write_prometheus(self.textfile)
+
+    def emit(self, event, **fields):
+        """
+        Send an event dictionary to the callback
+        """
+        if self.callback is not None:
+            fields['event'] = event
+            fields['traversal'] = self.traversal
+            self.callback(fields)
+
+    def prometheus_text(self):
+        """
+        Returns the metrics in Prometheus text exposition format
+        """
+        def labels(**values):
+            values = dict(traversal=self.traversal, **values)
+            return '{' + ','.join('%s="%s"' % (k, escape(v)) for k, v in values.items()) + '}'
+
+        lines = []
+        for name, kind, value in [('nodes_dequeued_total', 'counter', self.nodes_dequeued),
+                                  ('edges_scanned_total', 'counter', self.edges_scanned),
+                                  ('peak_queue_length', 'gauge', self.peak_queue_length),
+                                  ('seconds', 'gauge', self.seconds)]:
+            lines.append('# TYPE traversal_%s %s' % (name, kind))
+            lines.append('traversal_%s%s %s' % (name, labels(), value))
+        for name, key in [('level_frontier', 'frontier'), ('level_edges', 'edges'), ('level_seconds', 'seconds')]:
+            lines.append('# TYPE traversal_%s gauge' % name)
+            for record in self.levels:
+                if record[key] is not None:
+                    lines.append('traversal_%s%s %s' % (name, labels(level=record['level']), record[key]))
+        lines.append('# TYPE traversal_hub_degree gauge')
+        for node, degree in self.hubs:
+            lines.append('traversal_hub_degree%s %s' % (labels(node=node), degree))
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, filename):
+        """
+        Write the metrics to a Prometheus text file (replaced in one go)
+        """
+        tmp_file = filename + '.tmp'
+        with open(tmp_file, 'w', encoding='utf8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_file, filename)
+
+
+def escape(value):
+    """
+    Escape a Prometheus label value
+    """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
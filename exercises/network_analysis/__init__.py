@@ -0,0 +1,7 @@
+"""
+
+Practice Exercises for Python
+Network Analysis
+Ernesto Monroy
+
+"""